@@ -177,7 +177,7 @@ class CMEPredictionAPI {
     async getRealtimeData(): Promise<{
         data_source: string;
         total_points: number;
-        timestamps: string[];
+        timestamps: number[]; // epoch milliseconds (UTC)
         values: {
             speed: number[];
             density: number[];
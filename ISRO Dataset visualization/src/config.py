@@ -3,6 +3,7 @@ Configuration file for ISRO CME Detection System
 Replace hardcoded paths with configurable settings
 """
 import os
+import functools
 from pathlib import Path
 
 # Base directory - can be overridden with environment variable
@@ -53,6 +54,13 @@ CME_THRESHOLDS = {
     'duration_max_hours': 24,
 }
 
+@functools.lru_cache(maxsize=64)
+def _scan_cdf_files(search_dir: str, mtime: float) -> tuple:
+    """Cached directory scan; `mtime` is part of the key so new files invalidate it"""
+    with os.scandir(search_dir) as entries:
+        return tuple(e.path for e in entries if e.name.endswith('.cdf') and e.is_file())
+
+
 def get_cdf_files(date_folder: str = None):
     """
     Get list of CDF files from data directory
@@ -68,7 +76,9 @@ def get_cdf_files(date_folder: str = None):
     else:
         search_dir = DATA_DIR
     
-    if not search_dir.exists():
+    try:
+        mtime = os.stat(search_dir).st_mtime
+    except FileNotFoundError:
         return []
     
-    return list(search_dir.glob('*.cdf'))
+    return [Path(p) for p in _scan_cdf_files(str(search_dir), mtime)]
@@ -4,6 +4,11 @@
 
 import os
 import json
+import gzip
+import time
+import atexit
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -33,11 +38,52 @@ except ImportError:
     SPACEWEATHER_AVAILABLE = False
     print("spaceweather not installed. Run: pip install spaceweather")
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 
 
+def _ttl_cached(name):
+    """
+    Cache a fetcher's result on the instance for CACHE_TTL_SECONDS[name].
+    If a refresh raises a network error or returns None / {"error": ...}, the last
+    good value is served instead; empty results (e.g. no events in the window) are valid.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            cached = self._response_cache.get(key)
+            if cached is not None and now - cached[0] < self.CACHE_TTL_SECONDS[name]:
+                return cached[1]
+            
+            try:
+                result = func(self, *args, **kwargs)
+            except requests.exceptions.RequestException:
+                if cached is None:
+                    raise
+                print(f"Serving stale {name} data")
+                return cached[1]
+            failed = result is None or (isinstance(result, dict) and "error" in result)
+            if not failed:
+                self._response_cache[key] = (now, result)
+            elif cached is not None:
+                print(f"Serving stale {name} data")
+                return cached[1]
+            return result
+        return wrapper
+    return decorator
+
+
 class SpaceDataFetcher:
     """
     Real-time space weather data fetcher using multiple sources:
@@ -52,90 +98,132 @@ class SpaceDataFetcher:
     NOAA_BASE = "https://services.swpc.noaa.gov"
     NASA_DONKI = "https://api.nasa.gov/DONKI"
     
+    # Seconds each source stays fresh (upstream feeds refresh every 1-15 min)
+    CACHE_TTL_SECONDS = {
+        "server_date": 60,
+        "solar_wind": 10,
+        "xray_flux": 10,
+        "kp_index": 60,
+        "cme_events": 300,
+        "sunpy": 3600,
+    }
+    
+    # (connect, read) seconds; transient failures are retried by the session adapter
+    HTTP_TIMEOUT = (3, 15)
+    
     def __init__(self, cache_dir="./cache"):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.current_date = datetime.now()
+        self._response_cache = {}
+        self.session = self._create_session()
         print(f"SpaceDataFetcher initialized - {self.current_date}")
     
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Shared keep-alive session so repeated NOAA/NASA calls reuse connections"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=4,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                respect_retry_after_header=True
+            )
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "User-Agent": "Spacegen-SpaceDataFetcher/1.0",
+            "Accept": "application/json"
+        })
+        return session
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    @_ttl_cached("server_date")
     def get_server_date(self) -> str:
         """Get current date from reliable time server"""
         try:
             # Use worldtimeapi for accurate server time
-            response = requests.get("http://worldtimeapi.org/api/ip", timeout=5)
-            if response.ok:
-                data = response.json()
-                return data.get("datetime", "")[:10]
-        except:
+            response = self.session.get("http://worldtimeapi.org/api/ip", timeout=(3, 5))
+            response.raise_for_status()
+            return response.json().get("datetime", "")[:10]
+        except requests.exceptions.RequestException:
             pass
         return datetime.now().strftime("%Y-%m-%d")
     
+    @_ttl_cached("solar_wind")
     def fetch_noaa_realtime_solar_wind(self) -> dict:
         """Fetch real-time solar wind data from NOAA SWPC (DSCOVR satellite)"""
         print("Fetching real-time solar wind from NOAA...")
-        try:
-            url = f"{self.NOAA_BASE}/products/solar-wind/plasma-7-day.json"
-            response = requests.get(url, timeout=30)
-            if response.ok:
-                data = response.json()
-                # Skip header row, get latest readings
-                readings = data[1:] if len(data) > 1 else []
-                if readings:
-                    latest = readings[-1]
-                    return {
-                        "timestamp": latest[0],
-                        "density": float(latest[1]) if latest[1] else None,
-                        "speed": float(latest[2]) if latest[2] else None,
-                        "temperature": float(latest[3]) if latest[3] else None,
-                        "source": "DSCOVR/NOAA"
-                    }
-        except Exception as e:
-            print(f"NOAA solar wind error: {e}")
+        url = f"{self.NOAA_BASE}/products/solar-wind/plasma-7-day.json"
+        response = self.session.get(url, timeout=self.HTTP_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        # Skip header row, get latest readings
+        readings = data[1:] if len(data) > 1 else []
+        if readings:
+            latest = readings[-1]
+            return {
+                "timestamp": latest[0],
+                "density": float(latest[1]) if latest[1] else None,
+                "speed": float(latest[2]) if latest[2] else None,
+                "temperature": float(latest[3]) if latest[3] else None,
+                "source": "DSCOVR/NOAA"
+            }
         return {}
     
+    @_ttl_cached("xray_flux")
     def fetch_noaa_xray_flux(self) -> dict:
         """Fetch real-time X-ray flux from GOES satellite"""
         print("Fetching GOES X-ray flux...")
-        try:
-            url = f"{self.NOAA_BASE}/json/goes/primary/xrays-7-day.json"
-            response = requests.get(url, timeout=30)
-            if response.ok:
-                data = response.json()
-                if len(data) > 1:
-                    latest = data[-1]
-                    return {
-                        "timestamp": latest.get("time_tag"),
-                        "flux": latest.get("flux"),
-                        "energy": latest.get("energy"),
-                        "source": "GOES"
-                    }
-        except Exception as e:
-            print(f"GOES X-ray error: {e}")
+        url = f"{self.NOAA_BASE}/json/goes/primary/xrays-7-day.json"
+        response = self.session.get(url, timeout=self.HTTP_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        if len(data) > 1:
+            latest = data[-1]
+            return {
+                "timestamp": latest.get("time_tag"),
+                "flux": latest.get("flux"),
+                "energy": latest.get("energy"),
+                "source": "GOES"
+            }
         return {}
     
+    @_ttl_cached("cme_events")
     def fetch_nasa_cme_events(self, days_back=30) -> list:
         """Fetch recent CME events from NASA DONKI"""
         print(f"Fetching CME events from last {days_back} days...")
-        try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days_back)
-            url = (f"{self.NASA_DONKI}/CME?"
-                   f"startDate={start_date.strftime('%Y-%m-%d')}&"
-                   f"endDate={end_date.strftime('%Y-%m-%d')}&"
-                   f"api_key={self.NASA_API_KEY}")
-            response = requests.get(url, timeout=30)
-            if response.ok:
-                cmes = response.json()
-                return [{
-                    "time": cme.get("startTime"),
-                    "location": cme.get("sourceLocation"),
-                    "speed": cme.get("cmeAnalyses", [{}])[0].get("speed") if cme.get("cmeAnalyses") else None,
-                    "type": cme.get("cmeAnalyses", [{}])[0].get("type") if cme.get("cmeAnalyses") else None,
-                } for cme in (cmes or [])]
-        except Exception as e:
-            print(f"NASA CME error: {e}")
-        return []
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days_back)
+        url = (f"{self.NASA_DONKI}/CME?"
+               f"startDate={start_date.strftime('%Y-%m-%d')}&"
+               f"endDate={end_date.strftime('%Y-%m-%d')}&"
+               f"api_key={self.NASA_API_KEY}")
+        response = self.session.get(url, timeout=self.HTTP_TIMEOUT)
+        response.raise_for_status()
+        cmes = response.json()
+        return [{
+            "time": cme.get("startTime"),
+            "location": cme.get("sourceLocation"),
+            "speed": cme.get("cmeAnalyses", [{}])[0].get("speed") if cme.get("cmeAnalyses") else None,
+            "type": cme.get("cmeAnalyses", [{}])[0].get("type") if cme.get("cmeAnalyses") else None,
+        } for cme in (cmes or [])]
     
+    @_ttl_cached("kp_index")
     def fetch_kp_index(self) -> dict:
         """Fetch current Kp index using spaceweather library or NOAA"""
         print("Fetching Kp index...")
@@ -157,22 +245,20 @@ class SpaceDataFetcher:
                 print(f"spaceweather error: {e}")
         
         # Fallback to NOAA API
-        try:
-            url = f"{self.NOAA_BASE}/products/noaa-planetary-k-index.json"
-            response = requests.get(url, timeout=30)
-            if response.ok:
-                data = response.json()
-                if len(data) > 1:
-                    latest = data[-1]
-                    return {
-                        "timestamp": latest[0],
-                        "kp_index": float(latest[1]) if latest[1] else None,
-                        "source": "NOAA"
-                    }
-        except Exception as e:
-            print(f"NOAA Kp error: {e}")
+        url = f"{self.NOAA_BASE}/products/noaa-planetary-k-index.json"
+        response = self.session.get(url, timeout=self.HTTP_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        if len(data) > 1:
+            latest = data[-1]
+            return {
+                "timestamp": latest[0],
+                "kp_index": float(latest[1]) if latest[1] else None,
+                "source": "NOAA"
+            }
         return {}
     
+    @_ttl_cached("sunpy")
     def fetch_sunpy_data(self, instrument="aia", wavelength=171) -> dict:
         """Fetch solar data using SunPy (requires SunPy installation)"""
         if not SUNPY_AVAILABLE:
@@ -203,35 +289,71 @@ class SpaceDataFetcher:
             print(f"SunPy error: {e}")
             return {"error": str(e)}
     
+    @staticmethod
+    def _result_or_default(future, source: str, default):
+        """Unwrap a fetch future, logging network failures instead of raising"""
+        try:
+            return future.result()
+        except requests.exceptions.RequestException as e:
+            print(f"{source} error: {e}")
+            return default
+    
     def get_comprehensive_space_weather(self) -> dict:
         """Get comprehensive space weather summary from all sources"""
+        # The fetches are independent and network-bound, so run them
+        # concurrently over the pooled session: total time ~ slowest call
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            date_future = pool.submit(self.get_server_date)
+            solar_wind_future = pool.submit(self.fetch_noaa_realtime_solar_wind)
+            xray_future = pool.submit(self.fetch_noaa_xray_flux)
+            kp_future = pool.submit(self.fetch_kp_index)
+            cmes_future = pool.submit(self.fetch_nasa_cme_events, days_back=7)
+            server_date = date_future.result()
+        
         print("=" * 60)
-        print(f"Spacegen Space Weather Report - {self.get_server_date()}")
+        print(f"Spacegen Space Weather Report - {server_date}")
         print("=" * 60)
         
+        # One failed source should not abort the whole report
         return {
-            "date": self.get_server_date(),
+            "date": server_date,
             "timestamp": datetime.now().isoformat(),
-            "solar_wind": self.fetch_noaa_realtime_solar_wind(),
-            "xray_flux": self.fetch_noaa_xray_flux(),
-            "kp_index": self.fetch_kp_index(),
-            "recent_cmes": self.fetch_nasa_cme_events(days_back=7),
+            "solar_wind": self._result_or_default(solar_wind_future, "NOAA solar wind", {}),
+            "xray_flux": self._result_or_default(xray_future, "GOES X-ray", {}),
+            "kp_index": self._result_or_default(kp_future, "NOAA Kp", {}),
+            "recent_cmes": self._result_or_default(cmes_future, "NASA CME", []),
             "sunpy_available": SUNPY_AVAILABLE,
             "astropy_available": ASTROPY_AVAILABLE,
             "spaceweather_available": SPACEWEATHER_AVAILABLE,
         }
     
     def save_to_cache(self, data: dict, filename: str):
-        """Save data to local cache"""
-        cache_file = self.cache_dir / filename
-        with open(cache_file, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        """Save data to local cache (gzipped compact JSON, stored as <filename>.gz)"""
+        cache_file = self.cache_dir / f"{filename}.gz"
+        if ORJSON_AVAILABLE:
+            # orjson handles numpy values natively and is ~5x faster than json
+            payload = orjson.dumps(data, default=str,
+                                   option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC)
+        else:
+            payload = json.dumps(data, default=str, separators=(",", ":")).encode()
+        with gzip.open(cache_file, 'wb', compresslevel=3) as f:
+            f.write(payload)
         print(f"Cached: {cache_file}")
+    
+    def load_from_cache(self, filename: str):
+        """Load data written by save_to_cache, or None if it isn't cached"""
+        cache_file = self.cache_dir / f"{filename}.gz"
+        if not cache_file.exists():
+            return None
+        with gzip.open(cache_file, 'rb') as f:
+            payload = f.read()
+        return orjson.loads(payload) if ORJSON_AVAILABLE else json.loads(payload)
 
 
 # Main execution
 if __name__ == "__main__":
     fetcher = SpaceDataFetcher()
+    atexit.register(fetcher.close)
     
     # Get comprehensive report
     report = fetcher.get_comprehensive_space_weather()
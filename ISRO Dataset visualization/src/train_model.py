@@ -1,6 +1,10 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import torch.nn.functional as F
 import pandas as pd
 import numpy as np
 import spacepy.pycdf as pycdf
@@ -13,13 +17,18 @@ class AttentionLayer(nn.Module):
     """Self-attention layer for sequence modeling"""
     def __init__(self, hidden_size):
         super(AttentionLayer, self).__init__()
+        self.hidden_size = hidden_size
         self.attention = nn.Linear(hidden_size, 1)
         
     def forward(self, lstm_output):
         # lstm_output: (batch, seq_len, hidden_size)
-        attention_weights = torch.softmax(self.attention(lstm_output), dim=1)
-        context = torch.sum(attention_weights * lstm_output, dim=1)
-        return context, attention_weights
+        # softmax(Linear(x)) pooling == SDPA with the Linear weight as a learned query
+        # (the bias shifts every score equally, so it drops out of the softmax).
+        # Pre-multiplying by sqrt(d) cancels SDPA's 1/sqrt(d) scaling.
+        query = self.attention.weight * math.sqrt(self.hidden_size)
+        query = query.to(lstm_output.dtype).expand(lstm_output.size(0), 1, -1)
+        context = F.scaled_dot_product_attention(query, lstm_output, lstm_output)
+        return context.squeeze(1)
 
 class CMEDetectorLSTM(nn.Module):
     """Enhanced LSTM with Attention for CME Detection - Spacegen 2026"""
@@ -28,9 +37,9 @@ class CMEDetectorLSTM(nn.Module):
         self.hidden_size = hidden_size
         self.num_layers = num_layers
         
-        # Bidirectional LSTM for better context
+        # Bidirectional LSTM for better context (seq-first: cuDNN's native layout)
         self.lstm = nn.LSTM(input_size, hidden_size, num_layers, 
-                           batch_first=True, dropout=dropout, bidirectional=True)
+                           batch_first=False, dropout=dropout, bidirectional=True)
         
         # Attention layer
         self.attention = AttentionLayer(hidden_size * 2)  # *2 for bidirectional
@@ -40,18 +49,20 @@ class CMEDetectorLSTM(nn.Module):
         self.fc2 = nn.Linear(hidden_size, output_size)
         self.dropout = nn.Dropout(dropout)
         self.relu = nn.ReLU()
-        self.sigmoid = nn.Sigmoid()
 
     def forward(self, x):
-        # LSTM forward pass
-        lstm_out, _ = self.lstm(x)
+        # Returns raw logits; the sigmoid is fused into BCEWithLogitsLoss
+        # (apply torch.sigmoid at inference time for probabilities)
+        # LSTM forward pass: (batch, seq, feat) -> (seq, batch, feat) and back
+        lstm_out, _ = self.lstm(x.transpose(0, 1).contiguous())
+        lstm_out = lstm_out.transpose(0, 1)
         
         # Apply attention
-        context, _ = self.attention(lstm_out)
+        context = self.attention(lstm_out)
         
         # Fully connected layers
         out = self.dropout(self.relu(self.fc1(context)))
-        out = self.sigmoid(self.fc2(out))
+        out = self.fc2(out)
         return out
 
 # Custom Dataset
@@ -59,95 +70,224 @@ class CMEDataset(Dataset):
     def __init__(self, data, labels, sequence_length=50):
         self.sequence_length = sequence_length
         self.scaler = StandardScaler()
-        self.data = self.scaler.fit_transform(data)
-        min_len = len(self.data) - self.sequence_length + 1
-        self.data = self.data[:min_len + self.sequence_length - 1]
-        self.labels = labels[:min_len + self.sequence_length - 1]
+        # Scale once into a float32 tensor; items are zero-copy views into it
+        scaled = self.scaler.fit_transform(data).astype(np.float32, copy=False)
+        self.data = torch.from_numpy(scaled)
+        self.labels = torch.from_numpy(np.asarray(labels, dtype=np.float32))
 
     def __len__(self):
         return len(self.data) - self.sequence_length + 1
 
     def __getitem__(self, idx):
-        sequence = self.data[idx:idx + self.sequence_length]
-        label = self.labels[idx + self.sequence_length - 1]  # Label for the last time step
-        return torch.FloatTensor(sequence), torch.FloatTensor([label])
+        end = idx + self.sequence_length
+        sequence = self.data[idx:end]
+        label = self.labels[end - 1:end]  # Label for the last time step
+        return sequence, label
 
 # Load and Prepare Data from CDF Files
+# Output column -> CDF variable for each product type we read
+CDF_COLUMNS = {
+    'L1_AUX': {
+        'spacecraft_xpos': 'spacecraft_xpos',
+        'spacecraft_ypos': 'spacecraft_ypos',
+        'spacecraft_zpos': 'spacecraft_zpos',
+    },
+    'L2_BLK': {
+        'time': 'epoch_for_cdf_mod',
+        'proton_bulk_speed': 'proton_bulk_speed',
+        'proton_density': 'proton_density',
+        'alpha_density': 'alpha_density',
+        'spacecraft_xpos': 'spacecraft_xpos',
+        'spacecraft_ypos': 'spacecraft_ypos',
+        'spacecraft_zpos': 'spacecraft_zpos',
+    },
+}
+
+
+def _pad_and_fill(values, length):
+    """Pad a column with missing values up to `length`, then forward- and back-fill gaps"""
+    if len(values) < length:
+        missing = np.datetime64('NaT') if values.dtype.kind == 'M' else np.nan
+        values = np.concatenate([values, np.full(length - len(values), missing, dtype=values.dtype)])
+
+    mask = pd.isna(values)
+    if not mask.any():
+        return values
+    # Index of the last valid entry at or before each position
+    last_valid = np.where(mask, 0, np.arange(length))
+    np.maximum.accumulate(last_valid, out=last_valid)
+    filled = values[last_valid]
+    valid = np.flatnonzero(~mask)
+    if valid.size:
+        filled[:valid[0]] = values[valid[0]]
+    return filled
+
+
+def _read_one(file_path, wanted):
+    """Read the `wanted` {column: variable} arrays from one CDF file"""
+    columns = {}
+    with pycdf.CDF(file_path) as cdf:
+        for col, var in wanted.items():
+            if col == 'time':
+                columns[col] = pd.to_datetime(cdf[var][:]).to_numpy()
+            else:
+                columns[col] = np.asarray(cdf[var][:], dtype=np.float32)
+    return columns
+
+
 def prepare_data(file_paths):
-    dfs = []
+    # Decide up front which file supplies each column
+    # (the first file providing a column wins, so duplicates are never read)
+    jobs = []
+    assigned = set()
     for file_path in file_paths:
-        cdf = pycdf.CDF(file_path)
-        if 'L2_BLK' in str(file_path):
-            df = pd.DataFrame({
-                'time': pd.to_datetime(cdf['epoch_for_cdf_mod'][:]),
-                'proton_bulk_speed': cdf['proton_bulk_speed'][:],
-                'proton_density': cdf['proton_density'][:],
-                'alpha_density': cdf['alpha_density'][:],
-                'spacecraft_xpos': cdf['spacecraft_xpos'][:],
-                'spacecraft_ypos': cdf['spacecraft_ypos'][:],
-                'spacecraft_zpos': cdf['spacecraft_zpos'][:]
-            })
-            dfs.append(df)
-        elif 'L1_AUX' in str(file_path):
-            df = pd.DataFrame({
-                'spacecraft_xpos': cdf['spacecraft_xpos'][:],
-                'spacecraft_ypos': cdf['spacecraft_ypos'][:],
-                'spacecraft_zpos': cdf['spacecraft_zpos'][:]
-            })
-            dfs.append(df)
-    combined_df = pd.concat(dfs, axis=1, join='outer').ffill().bfill()
-
-    # ✅ Remove duplicated column names
-    combined_df = combined_df.loc[:, ~combined_df.columns.duplicated()]
-
-    return combined_df
+        product = next((p for p in CDF_COLUMNS if p in str(file_path)), None)
+        if product is None:
+            continue
+        wanted = {col: var for col, var in CDF_COLUMNS[product].items() if col not in assigned}
+        if wanted:
+            assigned.update(wanted)
+            jobs.append((file_path, wanted))
+
+    # CDF reads are I/O bound and the CDF C library releases the GIL on bulk reads
+    if len(jobs) <= 2:
+        results = [_read_one(path, wanted) for path, wanted in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as pool:
+            results = list(pool.map(lambda job: _read_one(*job), jobs))
+    columns = {col: values for result in results for col, values in result.items()}
+
+    # Files are aligned row-by-row; shorter columns are padded and filled
+    length = max((len(values) for values in columns.values()), default=0)
+    data = {col: _pad_and_fill(values, length) for col, values in columns.items()}
+    return pd.DataFrame(data, copy=False)
 
 
 # Generate Labels
-def generate_labels(df):
-    df['alpha_to_proton_ratio'] = df['alpha_density'] / df['proton_density']
+def generate_labels(df, window=10):
+    alpha = df['alpha_density'].to_numpy(np.float32)
+    proton = df['proton_density'].to_numpy(np.float32)
+    speed = df['proton_bulk_speed'].to_numpy(np.float32)
+    
+    # Ratio is 0 where there is no (valid) proton density
+    alpha_to_proton_ratio = np.divide(alpha, proton, out=np.zeros_like(alpha), where=proton > 0)
+    condition1 = alpha_to_proton_ratio > 0.08
     
-    # Convert both to boolean (avoid float before using `&`)
-    condition1 = (df['alpha_to_proton_ratio'] > 0.08)
-    condition2 = (df['proton_bulk_speed'] > 500).rolling(window=10, min_periods=1).mean() > 0.5
+    # Trailing rolling mean (min_periods=1) of the fast-wind flag via prefix sums
+    fast_wind = (speed > 500).astype(np.float32)
+    csum = np.concatenate(([0.0], np.cumsum(fast_wind, dtype=np.float64)))
+    counts = np.minimum(np.arange(1, len(fast_wind) + 1), window)
+    starts = np.arange(len(fast_wind)) + 1 - counts
+    condition2 = (csum[1:] - csum[starts]) / counts > 0.5
     
     # Combine both conditions
-    df['cme_label'] = (condition1 & condition2).astype(float)
-    return df['cme_label'].values
+    return (condition1 & condition2).astype(np.float32)
+
+
+# CUDA Graph for validation
+def _capture_val_graph(model, criterion, sequences, labels, amp_dtype):
+    """
+    Capture the eval forward + loss for one fixed batch shape on CUDA.
+    Returns (graph, static_x, static_y, static_loss), or None if capture fails.
+    Must be called with the model in eval mode under torch.inference_mode().
+    """
+    static_x = torch.empty_like(sequences)
+    static_y = torch.empty_like(labels)
+    static_x.copy_(sequences)
+    static_y.copy_(labels)
+    autocast = lambda: torch.autocast(device_type='cuda', dtype=amp_dtype, cache_enabled=False)
+    try:
+        # Warm up on a side stream so lazy init / cuDNN autotuning stays out of the graph
+        side = torch.cuda.Stream()
+        side.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(side):
+            for _ in range(3):
+                with autocast():
+                    criterion(model(static_x), static_y)
+        torch.cuda.current_stream().wait_stream(side)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            with autocast():
+                static_loss = criterion(model(static_x), static_y).float()
+        return graph, static_x, static_y, static_loss
+    except RuntimeError as e:
+        print(f"CUDA graph capture failed, validating eagerly: {e}")
+        return None
 
 
 # Training Function
 def train_model(model, train_loader, val_loader, num_epochs, device):
-    criterion = nn.BCELoss()
+    criterion = nn.BCEWithLogitsLoss()
     optimizer = optim.Adam(model.parameters(), lr=0.001)
+
+    # Mixed precision on CUDA: bf16 where supported, otherwise fp16 with loss scaling
+    use_amp = device.type == 'cuda'
+    amp_dtype = torch.bfloat16 if use_amp and torch.cuda.is_bf16_supported() else torch.float16
+    use_scaler = use_amp and amp_dtype == torch.float16
+    if hasattr(torch.amp, 'GradScaler'):
+        grad_scaler = torch.amp.GradScaler('cuda', enabled=use_scaler)
+    else:
+        # torch < 2.3
+        grad_scaler = torch.cuda.amp.GradScaler(enabled=use_scaler)
     scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=5)
     best_val_loss = float('inf')
     train_losses = []
     val_losses = []
 
+    # Fixed (batch, seq, feature) shapes -> let cuDNN benchmark and keep the fastest algorithm
+    torch.backends.cudnn.benchmark = True
+
+    # Bind hot-loop callables once
+    zero_grad, scale, scaler_step, scaler_update = (
+        optimizer.zero_grad, grad_scaler.scale, grad_scaler.step, grad_scaler.update)
+    autocast = torch.autocast
+
+    # Pack the LSTM weights once, before any graph capture: each flatten_parameters()
+    # call re-points them at a new buffer, which a captured graph would not see
+    model.lstm.flatten_parameters()
+
+    # Validation replays one captured CUDA graph per full batch (the optimizer
+    # updates the flattened parameters in place, so the graph sees current weights)
+    val_graph = None
+    try_val_graph = device.type == 'cuda'
+
     for epoch in range(num_epochs):
         model.train()
-        train_loss = 0
+        # Losses stay on the device; one .item() per epoch instead of a sync per batch
+        train_loss = torch.zeros((), device=device)
         for sequences, labels in train_loader:
-            sequences, labels = sequences.to(device), labels.to(device)
-            optimizer.zero_grad()
-            outputs = model(sequences)
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
-            train_loss += loss.item()
+            sequences, labels = sequences.to(device, non_blocking=True), labels.to(device, non_blocking=True)
+            zero_grad(set_to_none=True)
+            with autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                loss = criterion(model(sequences), labels)
+            scale(loss).backward()
+            scaler_step(optimizer)
+            scaler_update()
+            train_loss += loss.detach()
 
         # Validation
         model.eval()
-        val_loss = 0
-        with torch.no_grad():
+        val_loss = torch.zeros((), device=device)
+        with torch.inference_mode():
             for sequences, labels in val_loader:
-                sequences, labels = sequences.to(device), labels.to(device)
-                outputs = model(sequences)
-                val_loss += criterion(outputs, labels).item()
-
-        avg_train_loss = train_loss / len(train_loader)
-        avg_val_loss = val_loss / len(val_loader)
+                sequences, labels = sequences.to(device, non_blocking=True), labels.to(device, non_blocking=True)
+                if try_val_graph:
+                    try_val_graph = False
+                    val_graph = _capture_val_graph(model, criterion, sequences, labels, amp_dtype)
+                if val_graph is not None and sequences.shape == val_graph[1].shape:
+                    graph, static_x, static_y, static_loss = val_graph
+                    static_x.copy_(sequences, non_blocking=True)
+                    static_y.copy_(labels, non_blocking=True)
+                    graph.replay()
+                    val_loss += static_loss
+                else:
+                    # Short final batch (or no graph): plain eager forward
+                    with autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                        val_loss += criterion(model(sequences), labels).float()
+
+        avg_train_loss = train_loss.item() / len(train_loader)
+        avg_val_loss = val_loss.item() / len(val_loader)
         scheduler.step(avg_val_loss)
         train_losses.append(avg_train_loss)
         val_losses.append(avg_val_loss)
@@ -200,15 +340,24 @@ if __name__ == "__main__":
     train_features, val_features = features[:train_size], features[train_size:]
     train_labels, val_labels = labels[:train_size], labels[train_size:]
 
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    print(f"Using device: {device}")
+
     # Create Datasets and DataLoaders
+    # Larger batches keep the GPU LSTM kernels busy; warm workers + pinned memory
+    # overlap batch assembly and H2D copies with compute
+    batch_size = 256
     train_dataset = CMEDataset(train_features, train_labels)
     val_dataset = CMEDataset(val_features, val_labels)
-    train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=32)
+    loader_kwargs = dict(num_workers=min(4, os.cpu_count() or 1),
+                         pin_memory=(device.type == 'cuda'),
+                         persistent_workers=True, prefetch_factor=4)
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True,
+                              drop_last=len(train_dataset) > batch_size, **loader_kwargs)
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False,
+                            drop_last=False, **loader_kwargs)
 
     # Initialize enhanced model with attention
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"Using device: {device}")
     model = CMEDetectorLSTM(input_size=6, hidden_size=128, num_layers=3, dropout=0.3).to(device)
     print(f"Model parameters: {sum(p.numel() for p in model.parameters()):,}")
 
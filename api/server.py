@@ -4,12 +4,14 @@
 #
 # FastAPI backend for real-time CME predictions
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
 from typing import Optional, List, Dict
 import uvicorn
 from datetime import datetime
+import asyncio
+import copy
 import sys
 import os
 
@@ -26,7 +28,9 @@ app = FastAPI(
     description="Real-time Coronal Mass Ejection detection using AI ensemble model",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # Endpoints return plain dicts; orjson serializes them without a Pydantic pass
+    default_response_class=ORJSONResponse
 )
 
 # CORS for mobile app
@@ -42,36 +46,67 @@ app.add_middleware(
 predictor: Optional[CMEPredictor] = None
 data_loader: Optional[DSCOVRDataLoader] = None
 
+# Realtime prediction is refreshed in the background and served from memory
+PREDICTION_REFRESH_SECONDS = 30
+app.state.last_prediction = None
+app.state.prediction_lock = None
+app.state.refresh_task = None
+
 
 @app.on_event("startup")
 async def startup():
     """Initialize models on startup"""
     global predictor, data_loader
     print("[START] Starting OrbitBharat API Server...")
-    predictor = CMEPredictor(config='medium')
+    predictor = CMEPredictor(config='medium')   # CUDA compiles in __init__; CPU runs the int8 model
     data_loader = DSCOVRDataLoader()
+    app.state.prediction_lock = asyncio.Lock()
+    app.state.refresh_task = asyncio.create_task(_prediction_refresh_loop())
     print("[OK] Models loaded successfully")
 
 
-# Request/Response models
-class PredictionResponse(BaseModel):
-    status: str
-    timestamp: str
-    prediction: Optional[Dict] = None
-    current_conditions: Optional[Dict] = None
-    model_info: Optional[Dict] = None
-    error: Optional[str] = None
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the background prediction refresher and validation executor"""
+    if app.state.refresh_task is not None:
+        app.state.refresh_task.cancel()
+    if predictor is not None:
+        predictor.shutdown()
+
+
+async def _refresh_prediction(only_if_missing: bool = False) -> Dict:
+    """Run one realtime inference off the event loop (one at a time)"""
+    async with app.state.prediction_lock:
+        # Concurrent first requests share the result of whoever got the lock first
+        if only_if_missing and app.state.last_prediction is not None:
+            return app.state.last_prediction
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, predictor.predict_realtime)
+        # Keep the last good prediction if this refresh failed
+        if result.get('status') == 'success' or app.state.last_prediction is None:
+            app.state.last_prediction = result
+        return app.state.last_prediction
+
 
+async def _prediction_refresh_loop():
+    """Background task keeping app.state.last_prediction fresh"""
+    while True:
+        try:
+            await _refresh_prediction()
+        except Exception as e:
+            print(f"[WARN] Prediction refresh failed: {e}")
+        await asyncio.sleep(PREDICTION_REFRESH_SECONDS)
 
-class HealthResponse(BaseModel):
-    status: str
-    timestamp: str
-    model_loaded: bool
-    api_version: str
+
+async def _get_prediction() -> Dict:
+    """Return a copy of the cached prediction, computing it once if not yet available"""
+    if app.state.last_prediction is None:
+        await _refresh_prediction(only_if_missing=True)
+    return copy.deepcopy(app.state.last_prediction)
 
 
 # Endpoints
-@app.get("/", response_model=HealthResponse)
+@app.get("/")
 async def root():
     """Health check endpoint"""
     return {
@@ -82,17 +117,19 @@ async def root():
     }
 
 
-@app.get("/api/predict", response_model=PredictionResponse)
-async def predict():
+@app.get("/api/predict")
+async def predict(response: Response):
     """
     Get real-time CME prediction
     
     Uses live DSCOVR satellite data to predict CME probability
+    (refreshed every 30 seconds in the background)
     """
     if predictor is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    result = predictor.predict_realtime()
+    result = await _get_prediction()
+    response.headers["Cache-Control"] = f"max-age={PREDICTION_REFRESH_SECONDS}"
     return result
 
 
@@ -106,7 +143,7 @@ async def get_conditions():
 
 
 @app.get("/api/forecast/{hours}")
-async def get_forecast(hours: int = 24):
+async def get_forecast(response: Response, hours: int = 24):
     """
     Get CME forecast for next N hours
     
@@ -119,10 +156,11 @@ async def get_forecast(hours: int = 24):
     if predictor is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    result = predictor.predict_realtime()
+    result = await _get_prediction()
     
     if result['status'] == 'success':
         pred = result['prediction']
+        response.headers["Cache-Control"] = f"max-age={PREDICTION_REFRESH_SECONDS}"
         return {
             'forecast_period_hours': hours,
             'cme_probability': pred['cme_probability'],
@@ -150,7 +188,9 @@ async def get_feature_importance():
     if predictor is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    return predictor.get_feature_importance()
+    # Forward + backward over up to 128 windows: keep it off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, predictor.get_feature_importance)
 
 
 @app.get("/api/model-info")
@@ -202,13 +242,15 @@ async def get_realtime_data():
     # Return last 100 data points
     df_recent = df.tail(100)
     
-    return {
+    # Hand numpy arrays straight to orjson (no per-element Python conversion);
+    # timestamps are epoch milliseconds, missing values serialize as null
+    return ORJSONResponse({
         'data_source': 'DSCOVR',
         'total_points': len(df_recent),
         'columns': list(df_recent.columns),
-        'timestamps': [t.isoformat() for t in df_recent.index],
-        'values': df_recent.to_dict('list')
-    }
+        'timestamps': df_recent.index.to_numpy(dtype='datetime64[ms]').astype('int64'),
+        'values': {col: df_recent[col].to_numpy() for col in df_recent.columns}
+    })
 
 
 # Run server
@@ -227,4 +269,18 @@ if __name__ == '__main__':
     print("\nDocs: http://localhost:8000/docs")
     print("=" * 60 + "\n")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop + httptools come with uvicorn[standard] (uvloop is not available on Windows)
+    from importlib.util import find_spec
+    loop_impl = "uvloop" if find_spec("uvloop") else "asyncio"
+    http_impl = "httptools" if find_spec("httptools") else "h11"
+    
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    uvicorn.run(
+        "server:app" if workers > 1 else app,   # multiple workers need an import string
+        host="0.0.0.0",
+        port=8000,
+        loop=loop_impl,
+        http=http_impl,
+        workers=workers,
+        access_log=False
+    )
@@ -4,13 +4,26 @@
 #
 # Fetches real solar wind data from NOAA's DSCOVR satellite at L1
 
+import io
+import os
+import tempfile
+import time
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 import json
 
+# orjson parses the NOAA feeds straight from bytes in C; fall back to stdlib json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # Try importing scientific libraries
 try:
     from sunpy.timeseries import TimeSeries
@@ -26,6 +39,74 @@ try:
 except ImportError:
     ASTROPY_AVAILABLE = False
 
+# Persistent cache shared across processes/restarts (optional)
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+# JIT-compiled post-processing (optional; pandas path otherwise)
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _postprocess_kernel(raw, limit):
+    """
+    One pass over (n, 5) float32 [speed, density, temperature, bz, bt]:
+    appends plasma beta (NaN where bt == 0 / non-finite) and forward-fills
+    gaps of up to `limit` samples in every column, like DataFrame.ffill(limit=...).
+    """
+    n = raw.shape[0]
+    out = np.empty((n, 6), dtype=np.float32)
+    last = np.full(6, np.nan, dtype=np.float32)
+    gap = np.zeros(6, dtype=np.int64)
+    for i in range(n):
+        b = raw[i, 4]
+        beta = np.nan
+        if b != 0.0:
+            beta = 4.03e-11 * raw[i, 1] * raw[i, 2] / (b * b)
+            if not np.isfinite(beta):
+                beta = np.nan
+        for j in range(6):
+            v = raw[i, j] if j < 5 else beta
+            if v == v:
+                last[j] = v
+                gap[j] = 0
+                out[i, j] = v
+            else:
+                gap[j] += 1
+                out[i, j] = last[j] if gap[j] <= limit else np.nan
+    return out
+
+
+if NUMBA_AVAILABLE:
+    # No fastmath: it would let LLVM drop the NaN checks
+    _postprocess_kernel = numba.njit(cache=True)(_postprocess_kernel)
+
+
+def _ffill_limit(arr, limit):
+    """In-place column-wise forward fill of at most `limit` consecutive NaNs (2-D float32)"""
+    for j in numba.prange(arr.shape[1]):
+        last = np.nan
+        gap = 0
+        for i in range(arr.shape[0]):
+            v = arr[i, j]
+            if v == v:
+                last = v
+                gap = 0
+            else:
+                gap += 1
+                if gap <= limit:
+                    arr[i, j] = last
+
+
+if NUMBA_AVAILABLE:
+    _ffill_limit = numba.njit(parallel=True, cache=True)(_ffill_limit)
+
 
 class DSCOVRDataLoader:
     """
@@ -42,6 +123,10 @@ class DSCOVRDataLoader:
     4. Bz (nT) - Southward Bz causes geomagnetic storms
     5. Bt (nT) - Total magnetic field magnitude
     6. Plasma Beta - Ratio of plasma to magnetic pressure
+    
+    Frames are float32 with a datetime64[s] index: 1-minute solar wind values
+    carry at most ~5 significant digits, so float32 loses nothing and halves
+    the cached (memory and disk) footprint.
     """
     
     NOAA_BASE = "https://services.swpc.noaa.gov"
@@ -52,63 +137,117 @@ class DSCOVRDataLoader:
     MAG_1MIN = "/products/solar-wind/mag-1-day.json"
     MAG_7DAY = "/products/solar-wind/mag-7-day.json"
     
+    # Model feature order and normalization (from typical solar wind conditions)
+    FEATURES = ['speed', 'density', 'temperature', 'bz', 'bt', 'beta']
+    _NORM_MEAN = np.array([400, 5, 100000, 0, 5, 1], dtype=np.float32)
+    _NORM_STD = np.array([100, 5, 50000, 5, 3, 1], dtype=np.float32)
+    
+    DISK_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'dscovr_cache')
+    DISK_CACHE_SIZE_LIMIT = 64 << 20  # 64 MB
+    
     def __init__(self, cache_enabled: bool = True):
         self.cache_enabled = cache_enabled
         self._cache: Dict[str, pd.DataFrame] = {}
         self._cache_timestamp: Dict[str, datetime] = {}
         self.cache_ttl = timedelta(minutes=5)  # Cache for 5 minutes
+        
+        # Second cache level on disk, so restarted workers skip the NOAA re-fetch
+        self._disk_cache = None
+        if cache_enabled and DISKCACHE_AVAILABLE:
+            try:
+                self._disk_cache = diskcache.Cache(self.DISK_CACHE_DIR,
+                                                   size_limit=self.DISK_CACHE_SIZE_LIMIT)
+            except Exception as e:
+                print(f"[WARN] Disk cache unavailable: {e}")
+        
+        # Keep-alive session: plasma + mag fetches reuse the TCP/TLS connection
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=2))
     
     def _fetch_json(self, endpoint: str) -> Optional[List]:
         """Fetch JSON data from NOAA"""
         try:
             url = f"{self.NOAA_BASE}{endpoint}"
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=30)
             if response.ok:
-                return response.json()
+                return _json_loads(response.content)
         except Exception as e:
             print(f"Error fetching {endpoint}: {e}")
         return None
     
+    def _disk_cache_get(self, key: str) -> Optional[Tuple[pd.DataFrame, datetime]]:
+        """Return (frame, fetched_at) from the disk cache, or None"""
+        if self._disk_cache is None:
+            return None
+        try:
+            entry = self._disk_cache.get(key)
+            if entry is None:
+                return None
+            fetched_at, payload = entry
+            if isinstance(payload, bytes):
+                df = pd.read_parquet(io.BytesIO(payload))
+                df.index = df.index.astype('datetime64[s]')  # parquet stores ms at the finest
+            else:
+                df = payload
+            return df, datetime.fromtimestamp(fetched_at)
+        except Exception as e:
+            print(f"[WARN] Disk cache read failed: {e}")
+            return None
+    
+    def _disk_cache_set(self, key: str, df: pd.DataFrame):
+        """Store a frame on disk for cache_ttl (as parquet when pyarrow is available)"""
+        if self._disk_cache is None:
+            return
+        try:
+            try:
+                payload = df.to_parquet()
+            except ImportError:
+                payload = df   # diskcache pickles it
+            self._disk_cache.set(key, (time.time(), payload),
+                                 expire=self.cache_ttl.total_seconds())
+        except Exception as e:
+            print(f"[WARN] Disk cache write failed: {e}")
+    
+    @staticmethod
+    def _records_to_frame(data: List, numeric_cols: List[str]) -> pd.DataFrame:
+        """Convert NOAA [header, *rows] JSON into a time-indexed float32 DataFrame"""
+        headers = data[0]
+        arr = np.array(data[1:], dtype=object)
+        
+        columns = {}
+        for col in numeric_cols:
+            if col not in headers:
+                continue
+            values = arr[:, headers.index(col)]
+            # NOAA reports gaps as null (occasionally ""): map them to NaN, then cast in bulk
+            values = np.where((values == None) | (values == ''), 'nan', values)
+            try:
+                columns[col] = values.astype(np.float32)
+            except ValueError:
+                columns[col] = pd.to_numeric(values, errors='coerce').astype(np.float32)
+        
+        index = pd.DatetimeIndex(pd.to_datetime(arr[:, headers.index('time_tag')], cache=True),
+                                 name='time_tag').astype('datetime64[s]')
+        df = pd.DataFrame(columns, index=index, copy=False)
+        # NOAA feeds arrive chronological; the O(n) check skips an O(n log n) sort
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        return df
+    
     def _parse_plasma_data(self, data: List) -> pd.DataFrame:
         """Parse NOAA plasma JSON to DataFrame"""
         if not data or len(data) < 2:
             return pd.DataFrame()
         
         # First row is header
-        headers = data[0]
-        records = data[1:]
-        
-        df = pd.DataFrame(records, columns=headers)
-        
-        # Convert types
-        df['time_tag'] = pd.to_datetime(df['time_tag'])
-        for col in ['density', 'speed', 'temperature']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        df = df.set_index('time_tag')
-        df = df.sort_index()
-        
-        return df
+        return self._records_to_frame(data, ['density', 'speed', 'temperature'])
     
     def _parse_mag_data(self, data: List) -> pd.DataFrame:
         """Parse NOAA magnetic field JSON to DataFrame"""
         if not data or len(data) < 2:
             return pd.DataFrame()
         
-        headers = data[0]
-        records = data[1:]
-        
-        df = pd.DataFrame(records, columns=headers)
-        
-        df['time_tag'] = pd.to_datetime(df['time_tag'])
-        for col in ['bx_gsm', 'by_gsm', 'bz_gsm', 'bt']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        df = df.set_index('time_tag')
-        df = df.sort_index()
-        
-        return df
+        return self._records_to_frame(data, ['bx_gsm', 'by_gsm', 'bz_gsm', 'bt'])
     
     def get_realtime_data(self, days: int = 1) -> pd.DataFrame:
         """
@@ -129,18 +268,31 @@ class DSCOVRDataLoader:
             if datetime.now() - self._cache_timestamp[cache_key] < self.cache_ttl:
                 return self._cache[cache_key]
         
-        # Fetch data
+        # Another worker (or a previous run) may have fetched it recently
+        if self.cache_enabled:
+            cached = self._disk_cache_get(cache_key)
+            if cached is not None:
+                self._cache[cache_key], self._cache_timestamp[cache_key] = cached
+                return self._cache[cache_key]
+        
+        # Fetch data (the two feeds are independent, so fetch them concurrently)
         if days <= 1:
-            plasma_raw = self._fetch_json(self.PLASMA_1MIN)
-            mag_raw = self._fetch_json(self.MAG_1MIN)
+            plasma_endpoint, mag_endpoint = self.PLASMA_1MIN, self.MAG_1MIN
         else:
-            plasma_raw = self._fetch_json(self.PLASMA_7DAY)
-            mag_raw = self._fetch_json(self.MAG_7DAY)
+            plasma_endpoint, mag_endpoint = self.PLASMA_7DAY, self.MAG_7DAY
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            plasma_future = pool.submit(self._fetch_json, plasma_endpoint)
+            mag_raw = self._fetch_json(mag_endpoint)
+            plasma_raw = plasma_future.result()
         
         plasma_df = self._parse_plasma_data(plasma_raw) if plasma_raw else pd.DataFrame()
         mag_df = self._parse_mag_data(mag_raw) if mag_raw else pd.DataFrame()
         
         if plasma_df.empty and mag_df.empty:
+            # NOAA unreachable - serve the last good frame rather than nothing
+            if cache_key in self._cache:
+                print(f"[WARN] NOAA fetch failed, serving stale {cache_key} data")
+                return self._cache[cache_key]
             return pd.DataFrame()
         
         # Merge on time index
@@ -151,16 +303,6 @@ class DSCOVRDataLoader:
         else:
             df = mag_df
         
-        # Compute plasma beta
-        # Beta = (n * k * T) / (B² / 2μ₀)
-        # Simplified: beta ≈ 4.03e-6 * n * T / B²
-        if 'density' in df.columns and 'temperature' in df.columns and 'bt' in df.columns:
-            with np.errstate(divide='ignore', invalid='ignore'):
-                df['beta'] = 4.03e-11 * df['density'] * df['temperature'] / (df['bt'] ** 2)
-                df['beta'] = df['beta'].replace([np.inf, -np.inf], np.nan)
-        else:
-            df['beta'] = np.nan
-        
         # Rename for consistency
         rename_map = {
             'bz_gsm': 'bz',
@@ -168,21 +310,51 @@ class DSCOVRDataLoader:
             'by_gsm': 'by'
         }
         df = df.rename(columns=rename_map)
-        
-        # Select final columns
         final_cols = ['speed', 'density', 'temperature', 'bz', 'bt', 'beta']
-        df = df[[c for c in final_cols if c in df.columns]]
         
-        # Forward fill missing values (max 5 minutes)
-        df = df.ffill(limit=5)
+        if NUMBA_AVAILABLE and all(c in df.columns for c in final_cols[:5]):
+            # Beta, inf->NaN and ffill(limit=5) fused into one compiled pass
+            raw = df[final_cols[:5]].to_numpy(dtype=np.float32)
+            df = pd.DataFrame(_postprocess_kernel(raw, 5), index=df.index,
+                              columns=final_cols, copy=False)
+        else:
+            df = self._postprocess_pandas(df, final_cols)
         
         # Cache
         if self.cache_enabled:
             self._cache[cache_key] = df
             self._cache_timestamp[cache_key] = datetime.now()
+            self._disk_cache_set(cache_key, df)
         
         return df
     
+    @staticmethod
+    def _postprocess_pandas(df: pd.DataFrame, final_cols: List[str]) -> pd.DataFrame:
+        """Plasma beta + column selection + forward fill (partial feeds, or no numba)"""
+        # Compute plasma beta
+        # Beta = (n * k * T) / (B² / 2μ₀)
+        # Simplified: beta ≈ 4.03e-6 * n * T / B²
+        if 'density' in df.columns and 'temperature' in df.columns and 'bt' in df.columns:
+            n = df['density'].to_numpy(np.float32)
+            t = df['temperature'].to_numpy(np.float32)
+            b = df['bt'].to_numpy(np.float32)
+            # One guarded divide: NaN where bt == 0 instead of inf + a replace pass
+            beta = np.full(n.shape, np.nan, dtype=np.float32)
+            np.divide(4.03e-11 * n * t, b * b, out=beta, where=b != 0)
+            df['beta'] = beta
+        else:
+            df['beta'] = np.nan
+        
+        # Select final columns
+        df = df[[c for c in final_cols if c in df.columns]]
+        
+        # Forward fill missing values (max 5 minutes)
+        if NUMBA_AVAILABLE:
+            values = df.to_numpy(dtype=np.float32, copy=True)
+            _ffill_limit(values, 5)
+            return pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
+        return df.ffill(limit=5)
+    
     def prepare_model_input(self, 
                             window_minutes: int = 60,
                             normalize: bool = True) -> Tuple[np.ndarray, Dict]:
@@ -200,37 +372,24 @@ class DSCOVRDataLoader:
             raise ValueError("No data available from DSCOVR")
         
         # Get last N minutes
-        df_window = df.tail(window_minutes)
+        features = self.FEATURES
         
-        if len(df_window) < window_minutes:
+        # Fill any remaining NaN, then drop to a fresh float32 array
+        # (normalization below works in place)
+        df_window = df.tail(window_minutes)[features].ffill().bfill()
+        data = df_window.to_numpy(dtype=np.float32, copy=True)
+        
+        if data.shape[0] < window_minutes:
             # Pad with last known values
-            pad_count = window_minutes - len(df_window)
-            last_row = df_window.iloc[-1:] if len(df_window) > 0 else pd.DataFrame()
-            padding = pd.concat([last_row] * pad_count, ignore_index=True)
-            df_window = pd.concat([padding, df_window], ignore_index=True)
-        
-        # Feature order
-        features = ['speed', 'density', 'temperature', 'bz', 'bt', 'beta']
-        
-        # Fill any remaining NaN
-        df_window = df_window[features].ffill().bfill()
-        
-        # Normalization parameters (from typical solar wind conditions)
-        norm_params = {
-            'speed': (400, 100),      # mean, std
-            'density': (5, 5),
-            'temperature': (100000, 50000),
-            'bz': (0, 5),
-            'bt': (5, 3),
-            'beta': (1, 1)
-        }
+            pad = np.repeat(data[-1:], window_minutes - data.shape[0], axis=0)
+            data = np.concatenate([pad, data])
         
-        data = df_window[features].values
+        # Shortest float32 repr -> float: 412.3, not float32 noise like 412.29998779296875
+        latest = [float(str(v)) for v in data[-1]]
         
         if normalize:
-            for i, feat in enumerate(features):
-                mean, std = norm_params[feat]
-                data[:, i] = (data[:, i] - mean) / std
+            data -= self._NORM_MEAN
+            data /= self._NORM_STD
         
         # Shape: (1, seq_len, features)
         input_array = data.reshape(1, window_minutes, len(features))
@@ -238,15 +397,15 @@ class DSCOVRDataLoader:
         # Metadata
         metadata = {
             'timestamp': datetime.now().isoformat(),
-            'data_points': len(df_window),
+            'data_points': data.shape[0],
             'latest_values': {
-                'speed': float(df_window['speed'].iloc[-1]),
-                'density': float(df_window['density'].iloc[-1]),
-                'bz': float(df_window['bz'].iloc[-1]) if 'bz' in df_window.columns else None,
+                'speed': latest[0],
+                'density': latest[1],
+                'bz': latest[3],
             }
         }
         
-        return input_array.astype(np.float32), metadata
+        return input_array, metadata
     
     def get_current_conditions(self) -> Dict:
         """Get current space weather conditions summary"""
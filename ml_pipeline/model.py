@@ -11,23 +11,40 @@ import torch.nn.functional as F
 import numpy as np
 from typing import Tuple, Optional, Dict
 import math
+import copy
+import inspect
+
+# ONNX Runtime serving path (optional)
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
 
 
 class PositionalEncoding(nn.Module):
-    """Positional encoding for Transformer"""
+    """Positional encoding for Transformer (batch-first: x is (batch, seq_len, d_model))"""
     def __init__(self, d_model: int, max_len: int = 5000, dropout: float = 0.1):
         super().__init__()
         self.dropout = nn.Dropout(p=dropout)
         
         position = torch.arange(max_len).unsqueeze(1)
         div_term = torch.exp(torch.arange(0, d_model, 2) * (-math.log(10000.0) / d_model))
-        pe = torch.zeros(max_len, 1, d_model)
-        pe[:, 0, 0::2] = torch.sin(position * div_term)
-        pe[:, 0, 1::2] = torch.cos(position * div_term)
+        pe = torch.zeros(1, max_len, d_model)
+        pe[0, :, 0::2] = torch.sin(position * div_term)
+        pe[0, :, 1::2] = torch.cos(position * div_term)
         self.register_buffer('pe', pe)
     
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Checkpoints saved before the batch-first change store pe as (max_len, 1, d_model)
+        key = prefix + 'pe'
+        pe = state_dict.get(key)
+        if pe is not None and pe.dim() == 3 and pe.size(1) == 1 and pe.size(0) > 1:
+            state_dict[key] = pe.transpose(0, 1)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+    
     def forward(self, x: torch.Tensor) -> torch.Tensor:
-        x = x + self.pe[:x.size(0)]
+        x = x + self.pe[:, :x.size(1)]
         return self.dropout(x)
 
 
@@ -46,48 +63,57 @@ class MultiHeadAttention(nn.Module):
         self.w_o = nn.Linear(d_model, d_model)
         self.dropout = nn.Dropout(dropout)
     
-    def forward(self, x: torch.Tensor, mask: Optional[torch.Tensor] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+    def forward(self, x: torch.Tensor, mask: Optional[torch.Tensor] = None,
+                need_weights: bool = False) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
         batch_size, seq_len, _ = x.shape
         
         Q = self.w_q(x).view(batch_size, seq_len, self.n_heads, self.d_k).transpose(1, 2)
         K = self.w_k(x).view(batch_size, seq_len, self.n_heads, self.d_k).transpose(1, 2)
         V = self.w_v(x).view(batch_size, seq_len, self.n_heads, self.d_k).transpose(1, 2)
         
-        scores = torch.matmul(Q, K.transpose(-2, -1)) / math.sqrt(self.d_k)
-        
-        if mask is not None:
-            scores = scores.masked_fill(mask == 0, -1e9)
-        
-        attn_weights = F.softmax(scores, dim=-1)
-        attn_weights = self.dropout(attn_weights)
-        
-        attn_output = torch.matmul(attn_weights, V)
+        if need_weights:
+            # Explicit path: materializes the (batch, heads, L, L) weights for visualization
+            scores = torch.matmul(Q, K.transpose(-2, -1)) / math.sqrt(self.d_k)
+            
+            if mask is not None:
+                scores = scores.masked_fill(mask == 0, -1e9)
+            
+            attn_weights = F.softmax(scores, dim=-1)
+            attn_weights = self.dropout(attn_weights)
+            
+            attn_output = torch.matmul(attn_weights, V)
+        else:
+            # Fused kernel (Flash / memory-efficient); never builds the L x L matrix
+            attn_weights = None
+            attn_output = F.scaled_dot_product_attention(
+                Q, K, V,
+                attn_mask=(mask != 0) if mask is not None else None,
+                dropout_p=self.dropout.p if self.training else 0.0
+            )
         attn_output = attn_output.transpose(1, 2).contiguous().view(batch_size, seq_len, -1)
         
         return self.w_o(attn_output), attn_weights
 
 
-class TransformerEncoder(nn.Module):
+class TransformerEncoder(nn.TransformerEncoder):
     """Transformer encoder for global context"""
     def __init__(self, d_model: int = 128, n_heads: int = 8, n_layers: int = 4, 
                  d_ff: int = 512, dropout: float = 0.1):
-        super().__init__()
+        # Built on nn.TransformerEncoder so the whole stack runs through PyTorch's
+        # fused encoder path; parameter names (layers.N.*, norm.*) are unchanged
+        layer = nn.TransformerEncoderLayer(
+            d_model=d_model,
+            nhead=n_heads,
+            dim_feedforward=d_ff,
+            dropout=dropout,
+            batch_first=True
+        )
+        super().__init__(layer, num_layers=n_layers, norm=nn.LayerNorm(d_model),
+                         enable_nested_tensor=False)
         
-        self.layers = nn.ModuleList([
-            nn.TransformerEncoderLayer(
-                d_model=d_model,
-                nhead=n_heads,
-                dim_feedforward=d_ff,
-                dropout=dropout,
-                batch_first=True
-            ) for _ in range(n_layers)
-        ])
-        self.norm = nn.LayerNorm(d_model)
-    
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        for layer in self.layers:
-            x = layer(x)
-        return self.norm(x)
+        # The layers are deep copies of one template; give each its own attention init
+        for encoder_layer in self.layers:
+            encoder_layer.self_attn._reset_parameters()
 
 
 class BiLSTMWithAttention(nn.Module):
@@ -109,9 +135,10 @@ class BiLSTMWithAttention(nn.Module):
         self.attention = MultiHeadAttention(hidden_size * 2, n_heads=4, dropout=dropout)
         self.layer_norm = nn.LayerNorm(hidden_size * 2)
     
-    def forward(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
-        lstm_out, _ = self.lstm(x)
-        attn_out, attn_weights = self.attention(lstm_out)
+    def forward(self, x: torch.Tensor, need_weights: bool = False) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        # x: (batch, seq, feat) in FP32/FP16/BF16; cuDNN's fused LSTM needs it contiguous
+        lstm_out, _ = self.lstm(x.contiguous())
+        attn_out, attn_weights = self.attention(lstm_out, need_weights=need_weights)
         output = self.layer_norm(lstm_out + attn_out)  # Residual connection
         return output, attn_weights
 
@@ -144,11 +171,13 @@ class CMEEnsembleModel(nn.Module):
                  lstm_layers: int = 3,
                  transformer_layers: int = 4,
                  n_heads: int = 8,
-                 dropout: float = 0.3):
+                 dropout: float = 0.3,
+                 init_weights: bool = True):
         super().__init__()
         
         self.input_size = input_size
         self.hidden_size = hidden_size
+        self.compute_dtype = torch.float32  # see to_inference()
         
         # Input projection
         self.input_proj = nn.Linear(input_size, hidden_size)
@@ -201,8 +230,9 @@ class CMEEnsembleModel(nn.Module):
             nn.Sigmoid()
         )
         
-        # Initialize weights
-        self._init_weights()
+        # Initialize weights (skipped when a checkpoint will overwrite them)
+        if init_weights:
+            self._init_weights()
     
     def _init_weights(self):
         """Xavier/Kaiming initialization"""
@@ -218,38 +248,37 @@ class CMEEnsembleModel(nn.Module):
                     elif 'bias' in name:
                         nn.init.zeros_(param)
     
-    def forward(self, x: torch.Tensor) -> Dict[str, torch.Tensor]:
+    def forward(self, x: torch.Tensor, need_weights: bool = False) -> Dict[str, torch.Tensor]:
         """
         Forward pass
         
         Args:
             x: Input tensor of shape (batch, seq_len, input_size)
                Expected features: [speed, density, temp, bz, bt, beta]
+            need_weights: Also return LSTM attention weights (slower, unfused path)
         
         Returns:
             Dictionary with:
             - cme_probability: Probability of CME (0-1)
             - arrival_time: Predicted arrival hours
             - confidence: Model confidence (0-1)
-            - attention_weights: Attention visualization
+            - attention_weights: Attention visualization (None unless need_weights)
         """
         batch_size, seq_len, _ = x.shape
         
         # Input projection
-        x_proj = self.input_proj(x)
+        x_proj = self.input_proj(x.to(self.compute_dtype))
         
         # Branch 1: LSTM
-        lstm_out, attn_weights = self.lstm_branch(x_proj)
-        lstm_pooled = lstm_out.mean(dim=1)  # Global average pooling
+        lstm_out, attn_weights = self.lstm_branch(x_proj, need_weights=need_weights)
         
         # Branch 2: Transformer
-        x_pos = self.pos_encoder(x_proj.transpose(0, 1)).transpose(0, 1)
+        x_pos = self.pos_encoder(x_proj)
         transformer_out = self.transformer_branch(x_pos)
-        transformer_pooled = transformer_out.mean(dim=1)
         
-        # Ensemble fusion
-        fused = torch.cat([lstm_pooled, transformer_pooled], dim=-1)
-        features = self.fusion(fused)
+        # Ensemble fusion: one global average pooling over both branches (batch, 3H)
+        fused = torch.cat([lstm_out, transformer_out], dim=-1).mean(dim=1)
+        features = self.fusion(fused).float()  # output heads always run in FP32
         
         # Output predictions
         cme_prob = self.cme_probability(features).squeeze(-1)
@@ -263,14 +292,99 @@ class CMEEnsembleModel(nn.Module):
             'attention_weights': attn_weights
         }
     
-    def predict(self, x: torch.Tensor) -> Dict[str, float]:
-        """Single prediction with numpy input"""
+    @classmethod
+    def from_checkpoint(cls, path: str, config: str = 'medium', input_size: int = 6,
+                        map_location='cpu') -> 'CMEEnsembleModel':
+        """Build a preset model and load its weights, skipping the random init"""
+        cfg = MODEL_CONFIGS.get(config, MODEL_CONFIGS['medium'])
+        model = cls(input_size=input_size, init_weights=False, **cfg)
+        model.load_state_dict(torch.load(path, map_location=map_location, weights_only=True))
+        return model.eval()
+    
+    def export_onnx(self, path: str, seq_len: int = 60, opset_version: int = 17) -> str:
+        """
+        Export the three prediction heads to ONNX (batch dimension is dynamic).
+        Serve the file with ORTPredictor; for int8 run
+        onnxruntime.quantization.quantize_dynamic(path, out_path) on the export.
+        """
+        self.eval()
+        dummy = torch.zeros(1, seq_len, self.input_size, device=self.pos_encoder.pe.device)
+        # torch >= 2.5 defaults towards the dynamo exporter; older versions lack the flag
+        extra = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+        # The wrapper must be in eval mode too: export restores its training flag
+        # afterwards, which would recursively switch this model back to train()
+        torch.onnx.export(
+            _ONNXHeads(self).eval(), (dummy,), path,
+            opset_version=opset_version,
+            input_names=['x'],
+            output_names=list(_ONNXHeads.OUTPUTS),
+            dynamic_axes={'x': {0: 'batch'}, **{name: {0: 'batch'} for name in _ONNXHeads.OUTPUTS}},
+            **extra
+        )
+        return path
+    
+    def to_torchscript(self, seq_len: int = 60) -> torch.jit.ScriptModule:
+        """
+        Traced + frozen TorchScript version of this model (for torch versions
+        without torch.compile). Returns only the three prediction heads, as a dict.
+        """
         self.eval()
+        dummy = torch.zeros(1, seq_len, self.input_size, device=self.pos_encoder.pe.device)
         with torch.no_grad():
+            traced = torch.jit.trace(_ScriptHeads(self).eval(), dummy, strict=False, check_trace=False)
+            return torch.jit.freeze(traced)
+    
+    def to_inference(self, dtype: str = 'bf16') -> nn.Module:
+        """
+        Reduced-precision copy of the model for inference (this model is untouched)
+        
+        Args:
+            dtype: 'bf16' - weights and activations in bfloat16; the probability,
+                            arrival-time and confidence heads stay FP32 for stability
+                   'fp16' - same, in float16 (CUDA tensor cores without bf16)
+                   'int8' - dynamic int8 quantization of LSTM/Linear layers (CPU only)
+        """
+        model = copy.deepcopy(self).eval()
+        
+        if dtype in ('bf16', 'fp16'):
+            half = torch.bfloat16 if dtype == 'bf16' else torch.float16
+            model.to(half)
+            for head in (model.cme_probability, model.arrival_time, model.confidence):
+                head.float()
+            model.compute_dtype = half
+            return model
+        
+        if dtype == 'int8':
+            # nn.TransformerEncoderLayer reads its Linear weights directly in the
+            # fast-path check, so its submodules are left in FP32
+            encoder_layers = tuple(
+                f"{name}." for name, module in model.named_modules()
+                if isinstance(module, nn.TransformerEncoderLayer)
+            )
+            qconfig_spec = {
+                name: torch.ao.quantization.default_dynamic_qconfig
+                for name, module in model.named_modules()
+                if isinstance(module, (nn.LSTM, nn.Linear)) and not name.startswith(encoder_layers)
+            }
+            return torch.ao.quantization.quantize_dynamic(
+                model, qconfig_spec, dtype=torch.qint8, inplace=True
+            )
+        
+        raise ValueError(f"Unknown inference dtype: {dtype}")
+    
+    def predict(self, x: torch.Tensor) -> Dict[str, float]:
+        """Single prediction with numpy input (call .eval() once beforehand)"""
+        assert not self.training, "call .eval() before predict"
+        with torch.inference_mode():
             if isinstance(x, np.ndarray):
-                x = torch.FloatTensor(x)
+                # Zero-copy when the array is already contiguous float32
+                x = torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32))
             if x.dim() == 2:
                 x = x.unsqueeze(0)
+            device = self.pos_encoder.pe.device
+            if device.type == 'cuda' and x.device.type == 'cpu':
+                x = x.pin_memory()
+            x = x.to(device, non_blocking=True)
             
             output = self.forward(x)
             
@@ -281,6 +395,53 @@ class CMEEnsembleModel(nn.Module):
             }
 
 
+class _ONNXHeads(nn.Module):
+    """Tuple-output view of CMEEnsembleModel for ONNX export"""
+    OUTPUTS = ('cme_probability', 'arrival_time_hours', 'confidence')
+    
+    def __init__(self, model: CMEEnsembleModel):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        output = self.model(x)
+        return tuple(output[name] for name in self.OUTPUTS)
+
+
+class _ScriptHeads(nn.Module):
+    """Dict-of-tensors view of CMEEnsembleModel for TorchScript tracing (no attention_weights)"""
+    def __init__(self, model: CMEEnsembleModel):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, x: torch.Tensor) -> Dict[str, torch.Tensor]:
+        output = self.model(x)
+        return {name: output[name] for name in _ONNXHeads.OUTPUTS}
+
+
+class ORTPredictor:
+    """
+    ONNX Runtime inference for an exported CMEEnsembleModel
+    (same predict() API as CMEEnsembleModel.predict)
+    """
+    def __init__(self, path: str, providers: Optional[list] = None):
+        if not ORT_AVAILABLE:
+            raise ImportError("onnxruntime not installed. Run: pip install onnxruntime")
+        self.session = ort.InferenceSession(path, providers=providers or ['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def predict(self, x) -> Dict[str, float]:
+        """Single prediction with numpy input"""
+        if isinstance(x, torch.Tensor):
+            x = x.detach().cpu().numpy()
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[np.newaxis]
+        
+        outputs = self.session.run(None, {self.input_name: x})
+        return {name: float(value[0]) for name, value in zip(_ONNXHeads.OUTPUTS, outputs)}
+
+
 # Model configuration for different use cases
 MODEL_CONFIGS = {
     'small': {
@@ -304,10 +465,20 @@ MODEL_CONFIGS = {
 }
 
 
-def create_model(config: str = 'medium', input_size: int = 6) -> CMEEnsembleModel:
-    """Factory function to create model with preset configuration"""
+def create_model(config: str = 'medium', input_size: int = 6,
+                 compile: bool = False, init_weights: bool = True) -> CMEEnsembleModel:
+    """
+    Factory function to create model with preset configuration
+    
+    compile=True wraps the model with torch.compile for inference. Leave it off
+    when loading/saving checkpoints: a compiled module's state_dict keys gain
+    an '_orig_mod.' prefix. Pass init_weights=False when a checkpoint will be loaded.
+    """
     cfg = MODEL_CONFIGS.get(config, MODEL_CONFIGS['medium'])
-    return CMEEnsembleModel(input_size=input_size, **cfg)
+    model = CMEEnsembleModel(input_size=input_size, init_weights=init_weights, **cfg)
+    if compile and hasattr(torch, 'compile'):
+        model = torch.compile(model.eval(), mode='reduce-overhead', fullgraph=False)
+    return model
 
 
 # Testing
@@ -336,7 +507,7 @@ if __name__ == '__main__':
     
     print(f"\nInput shape: {dummy_input.shape}")
     
-    output = model(dummy_input)
+    output = model(dummy_input, need_weights=True)
     
     print(f"\nOutputs:")
     print(f"  CME Probability: {output['cme_probability'].shape} -> values: {output['cme_probability'].detach().numpy()}")
@@ -0,0 +1,60 @@
+# CME Ensemble Model - export / reduced-precision paths vs the eager FP32 model
+# (run with pytest from ml_pipeline/)
+
+import numpy as np
+import pytest
+import torch
+
+from model import create_model, ORTPredictor, ORT_AVAILABLE
+
+HEADS = ('cme_probability', 'arrival_time_hours', 'confidence')
+
+
+@pytest.fixture(scope='module')
+def model():
+    torch.manual_seed(0)
+    return create_model('small').eval()
+
+
+@pytest.fixture(scope='module')
+def window():
+    return torch.from_numpy(np.random.default_rng(0).standard_normal((4, 60, 6)).astype(np.float32))
+
+
+def _heads(module, x):
+    with torch.inference_mode():
+        out = module(x)
+    # arrival time is scaled to 0-72 h: compare on the same 0-1 scale as the others
+    return {k: out[k].float() / (72 if k == 'arrival_time_hours' else 1) for k in HEADS}
+
+
+def _assert_close(module, model, x, atol):
+    expected, got = _heads(model, x), _heads(module, x)
+    for k in HEADS:
+        torch.testing.assert_close(got[k], expected[k], atol=atol, rtol=0, msg=k)
+
+
+def test_torchscript_matches_eager(model, window):
+    _assert_close(model.to_torchscript(), model, window, atol=1e-5)
+
+
+@pytest.mark.parametrize('dtype', ['bf16', 'fp16'])
+def test_half_precision_close_to_eager(model, window, dtype):
+    _assert_close(model.to_inference(dtype), model, window, atol=1e-2)
+    assert not model.training
+
+
+def test_int8_close_to_eager(model, window):
+    _assert_close(model.to_inference('int8'), model, window, atol=5e-2)
+
+
+@pytest.mark.skipif(not ORT_AVAILABLE, reason='onnxruntime not installed')
+def test_onnx_export_matches_eager_and_keeps_eval_mode(model, window, tmp_path):
+    path = model.export_onnx(str(tmp_path / 'cme.onnx'))
+    assert not model.training
+
+    ort_model = ORTPredictor(path)
+    expected = model.predict(window[:1])
+    got = ort_model.predict(window[0].numpy())
+    for k in HEADS:
+        assert got[k] == pytest.approx(expected[k], abs=1e-4)
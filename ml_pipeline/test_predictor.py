@@ -0,0 +1,40 @@
+# CME Predictor - alert level checks (run with pytest from ml_pipeline/)
+
+import numpy as np
+
+from predictor import CMEPredictor
+
+
+def _bare_predictor() -> CMEPredictor:
+    """Predictor with only the alert thresholds set (no model load)"""
+    p = CMEPredictor.__new__(CMEPredictor)
+    p._thresh_sorted = np.array([0.3, 0.5, 0.7, 0.9])
+    return p
+
+
+def test_nan_probability_is_no_alert():
+    p = _bare_predictor()
+    assert p._get_alert_level(float('nan')) == 'NONE'
+    levels = p._get_alert_levels(np.array([np.nan, 0.1, 0.5, 0.95, np.nan]))
+    assert levels.tolist() == ['NONE', 'NONE', 'MODERATE', 'EXTREME', 'NONE']
+
+
+def test_int8_model_falls_back_to_fp32_on_nan_window():
+    import torch
+    from model import create_model
+    
+    p = _bare_predictor()
+    p.device = torch.device('cpu')
+    p.model = create_model('small').eval()
+    p._inference_model = p.model.to_inference('int8')
+    p._quantized = True
+    p._host_buf = torch.empty(1, 60, 6)
+    
+    # All-NaN window: int8 raises in ChooseQuantizationParams; one NaN column:
+    # int8 silently returns a number where FP32 returns NaN
+    for nan_cols in (slice(None), 2):
+        window = np.random.default_rng(0).standard_normal((60, 6)).astype(np.float32)
+        window[:, nan_cols] = np.nan
+        out = p._infer(window)
+        assert np.isnan(out['cme_probability'])
+        assert p._get_alert_level(out['cme_probability']) == 'NONE'